@@ -2,15 +2,25 @@ import json
 import logging
 import os
 import sys
+import threading
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List
 
 import pika
-from azure.storage.blob import BlobServiceClient, ContainerClient, BlobProperties  # type: ignore
+from azure.storage.blob import BlobServiceClient  # type: ignore
 from otel_logging import init_logging
-from tenacity import retry, stop_after_attempt, wait_exponential  # type: ignore
+from rabbit_publisher import RabbitPublisher
+
+try:
+    # orjson is ~3-6x faster than stdlib json for these small payloads
+    import orjson  # type: ignore
+
+    _dumps = orjson.dumps  # returns bytes, which pika accepts directly
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 # ---------------------------------------------------------------------------
 # Configuration via environment variables (with sensible defaults)
@@ -20,13 +30,20 @@ AZURITE_CONN_STR = os.getenv(
     "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;BlobEndpoint=http://azurite:10000/devstoreaccount1;",
 )
 CONTAINER_NAME = os.getenv("BLOB_CONTAINER", "incoming")
+# Optional server-side list filter (e.g. "incoming/"); when new blobs land
+# under a dedicated prefix this keeps the processed/ namespace off the wire
+BLOB_PREFIX = os.getenv("BLOB_PREFIX", "")
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "60"))  # seconds
+MAX_POLL_INTERVAL = int(os.getenv("MAX_POLL_INTERVAL", "300"))  # idle backoff cap
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
 RABBITMQ_USER = os.getenv("RABBITMQ_USER", "ic-tester")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "ic-tester")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "blob.events")
+PUBLISH_BATCH_SIZE = int(os.getenv("PUBLISH_BATCH_SIZE", "200"))
+# Workers > 1 overlaps broker round-trips across connections during publish
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "1"))
 
 SERVICE_NAME_VALUE = os.getenv("OTEL_SERVICE_NAME", "BlobBasedEventHandler")
 
@@ -40,27 +57,32 @@ logger, _ = init_logging(SERVICE_NAME_VALUE)
 # RabbitMQ utilities
 # ---------------------------------------------------------------------------
 
-@retry(stop=stop_after_attempt(10), wait=wait_exponential(multiplier=1, min=4, max=10))
-def get_rabbit_connection():
-    logger.info("Attempting to connect to RabbitMQ", extra={"host": RABBITMQ_HOST, "port": RABBITMQ_PORT})
+def rabbit_parameters() -> pika.ConnectionParameters:
     creds = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
-    parameters = pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds)
-    return pika.BlockingConnection(parameters)
+    return pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds)
+
+
+# Per-thread publishers: pika's BlockingConnection is not thread-safe, so
+# each pool worker keeps its own connection and channel
+_worker_publishers = threading.local()
 
 
-def ensure_queue(channel):
-    channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+def _worker_publish(bodies: List[bytes]):
+    publisher = getattr(_worker_publishers, "publisher", None)
+    if publisher is None:
+        publisher = RabbitPublisher(rabbit_parameters(), (RABBITMQ_QUEUE,), logger=logger)
+        _worker_publishers.publisher = publisher
+    for body in bodies:
+        publisher.publish(RABBITMQ_QUEUE, body)
 
 # ---------------------------------------------------------------------------
 # Blob utilities
 # ---------------------------------------------------------------------------
 
-def list_blobs(container_client: ContainerClient) -> List[BlobProperties]:
-    return [blob for blob in container_client.list_blobs()]  # type: ignore
-
-
 def build_message(container: str, blob_path: str, blob_name: str) -> dict:
-    dest_path = f"processed/{uuid.uuid4()}-{blob_name}"
+    # os.urandom().hex() is a few times cheaper than uuid.uuid4() and just
+    # as unique for a dest-path tag
+    dest_path = f"processed/{os.urandom(12).hex()}-{blob_name}"
     return {
         "container": container,
         "path": blob_path,
@@ -69,6 +91,26 @@ def build_message(container: str, blob_path: str, blob_name: str) -> dict:
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
 
+
+def publish_batch(batch: List[str], publisher, pool):
+    """Serialize and publish one batch of blob names."""
+    # Serialize bodies up-front so the publish loop stays tight
+    bodies = []
+    for blob_name in batch:
+        path, _, name = blob_name.rpartition("/")
+        msg_body = build_message(CONTAINER_NAME, path + "/" if path else "", name)
+        bodies.append(_dumps(msg_body))
+
+    if pool is None:
+        for body in bodies:
+            publisher.publish(RABBITMQ_QUEUE, body)
+    else:
+        step = -(-len(bodies) // PUBLISH_WORKERS)  # ceil division
+        slices = [bodies[i:i + step] for i in range(0, len(bodies), step)]
+        list(pool.map(_worker_publish, slices))
+
+    logger.info("Published blob event batch", extra={"batch_size": len(batch)})
+
 # ---------------------------------------------------------------------------
 # Main polling loop
 # ---------------------------------------------------------------------------
@@ -80,21 +122,34 @@ def main():
     blob_service = BlobServiceClient.from_connection_string(AZURITE_CONN_STR)
     container_client = blob_service.get_container_client(CONTAINER_NAME)
 
-    # Connect to RabbitMQ once at startup; recreate if closed
-    rabbit_conn = get_rabbit_connection()
-    channel = rabbit_conn.channel()
-    ensure_queue(channel)
+    # Persistent publisher: queue is declared once, reconnects are handled
+    # internally with backoff. With PUBLISH_WORKERS > 1 batches are fanned
+    # out over a bounded pool instead, overlapping serialization with
+    # in-flight network I/O.
+    pool = None
+    publisher = None
+    if PUBLISH_WORKERS > 1:
+        pool = ThreadPoolExecutor(max_workers=PUBLISH_WORKERS, thread_name_prefix="publish")
+    else:
+        publisher = RabbitPublisher(rabbit_parameters(), (RABBITMQ_QUEUE,), logger=logger)
 
     # Track which blobs have been queued to prevent requeuing
     queued_blobs = set()
 
+    empty_polls = 0
     while True:
+        poll_started = time.monotonic()
         try:
-            blobs = list_blobs(container_client)
-            logger.info("Polled container", extra={"blob_count": len(blobs)})
+            # Stream the listing: publishing overlaps with Azure paging and
+            # the full BlobProperties list is never materialized
+            blob_iter = container_client.list_blobs(name_starts_with=BLOB_PREFIX or None)
 
+            blob_count = 0
             new_blobs_found = 0
-            for blob in blobs:
+            batch = []
+            for blob in blob_iter:
+                blob_count += 1
+
                 # Skip blobs already processed (simple heuristic)
                 if blob.name.startswith("processed/"):
                     continue
@@ -103,38 +158,36 @@ def main():
                 if blob.name in queued_blobs:
                     continue
 
-                path, _, name = blob.name.rpartition("/")
-                msg_body = build_message(CONTAINER_NAME, path + "/" if path else "", name)
-
-                channel.basic_publish(
-                    exchange="",
-                    routing_key=RABBITMQ_QUEUE,
-                    body=json.dumps(msg_body),
-                    properties=pika.BasicProperties(delivery_mode=2),  # persistent
-                )
-                
-                # Track that we've queued this blob
-                queued_blobs.add(blob.name)
-                new_blobs_found += 1
-                logger.info("Published blob event", extra={"blob": blob.name})
+                batch.append(blob.name)
+                if len(batch) >= PUBLISH_BATCH_SIZE:
+                    publish_batch(batch, publisher, pool)
+                    queued_blobs.update(batch)
+                    new_blobs_found += len(batch)
+                    batch = []
+
+            if batch:
+                publish_batch(batch, publisher, pool)
+                queued_blobs.update(batch)
+                new_blobs_found += len(batch)
+
+            logger.info("Polled container", extra={"blob_count": blob_count})
 
             if new_blobs_found > 0:
+                empty_polls = 0
                 logger.info("Published new blob events", extra={"new_blobs": new_blobs_found, "total_queued": len(queued_blobs)})
             else:
+                empty_polls = min(empty_polls + 1, 10)
                 logger.info("No new blobs to queue", extra={"total_queued": len(queued_blobs)})
 
         except Exception as exc:
+            # RabbitMQ reconnection is handled inside RabbitPublisher
             logger.exception("Error during poll iteration", extra={"error": str(exc)})
-            # Attempt to recreate RabbitMQ connection if necessary
-            if rabbit_conn.is_closed:
-                try:
-                    rabbit_conn = get_rabbit_connection()
-                    channel = rabbit_conn.channel()
-                    ensure_queue(channel)
-                except Exception:
-                    logger.exception("Failed to reconnect to RabbitMQ")
         finally:
-            time.sleep(POLL_INTERVAL)
+            # Back off while idle, reset to baseline as soon as work appears;
+            # monotonic scheduling keeps this robust against wall-clock jumps
+            sleep_for = min(POLL_INTERVAL * (2 ** empty_polls), MAX_POLL_INTERVAL)
+            elapsed = time.monotonic() - poll_started
+            time.sleep(max(0.0, sleep_for - elapsed))
 
 
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
+import functools
 import json
 import logging
 import os
 import sys
-import threading
 import time
+import traceback
 import uuid
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Optional
 
 logger = None
@@ -52,6 +54,24 @@ try:
     logger.info("Importing otel_logging...")
     from otel_logging import init_logging
     logger.info("otel_logging import successful")
+
+    # Try rabbit_publisher import
+    logger.info("Importing rabbit_publisher...")
+    from rabbit_publisher import RabbitPublisher
+    logger.info("rabbit_publisher import successful")
+
+    # Try orjson import - fast JSON for the per-message hot path
+    logger.info("Importing orjson...")
+    try:
+        import orjson
+        _dumps = orjson.dumps  # returns bytes, which pika accepts directly
+        _loads = orjson.loads
+        logger.info("orjson import successful")
+    except ImportError:
+        def _dumps(obj):
+            return json.dumps(obj).encode()
+        _loads = json.loads
+        logger.info("orjson unavailable, falling back to stdlib json")
     
     logger.info("All imports completed successfully")
     
@@ -78,6 +98,12 @@ RABBITMQ_USER = os.getenv("RABBITMQ_USER", "ic-tester")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "ic-tester")
 EVENT_QUEUE = os.getenv("RABBITMQ_QUEUE", "blob.events")
 ERROR_QUEUE = os.getenv("RABBITMQ_DLQ", "blob.error")
+# Source deletes are coalesced into one batched request (service max is 256)
+BATCH_DELETE_SIZE = int(os.getenv("BATCH_DELETE_SIZE", "256"))
+# Messages consumed before the container terminates (1 = single-job mode);
+# the prefetch window keeps the pipeline full when the budget is raised
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "1"))
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "64"))
 
 
 # ---------------------------------------------------------------------------
@@ -114,88 +140,114 @@ except Exception as init_err:
 # Blob processing functions
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=2048)
+def _blob_client(name: str):
+    # BlobClient construction parses the URL and wires up a pipeline each
+    # time; cache per path (BlobClient is thread-safe, so sharing is fine)
+    return container_client.get_blob_client(name)
+
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=4))
-def move_blob(src_blob: str, dest_blob: str):
-    """Move a blob from source to destination path with retry logic."""
+def copy_blob(src_blob: str, dest_blob: str):
+    """Copy a blob to its destination path with retry logic.
+
+    The source delete is deferred to flush_pending_deletes so bursts of
+    messages coalesce into one batched delete request.
+    """
     try:
-        logger.info("Starting blob move operation", extra={"src": src_blob, "dest": dest_blob})
-        
+        logger.debug("Starting blob copy", extra={"src": src_blob, "dest": dest_blob})
+
         # Check if container_client is properly initialized
         if not container_client:
             raise ValueError("Container client not initialized")
-        
-        logger.info("Getting blob clients for source and destination")
-        src_client = container_client.get_blob_client(src_blob)
-        dest_client = container_client.get_blob_client(dest_blob)
-        
-        logger.info("Blob clients created", extra={"src_url": src_client.url})
+
+        logger.debug("Getting blob clients for source and destination")
+        src_client = _blob_client(src_blob)
+        dest_client = _blob_client(dest_blob)
+
+        logger.debug("Blob clients created", extra={"src_url": src_client.url})
 
         # Start copy operation
-        logger.info("Starting blob copy operation")
         try:
             copy_info = dest_client.start_copy_from_url(src_client.url)
-            logger.info("Copy operation initiated", extra={"copy_id": copy_info.get("copy_id")})
-            
-            # Wait for copy to complete (for small files this should be instant)
-            copy_status = dest_client.get_blob_properties().copy.status
-            logger.info("Copy operation completed", extra={"copy_status": copy_status})
-            
-            if copy_status == "success":
-                # Delete the source blob after successful copy
-                logger.info("Deleting source blob after successful copy")
-                src_client.delete_blob()
-                logger.info("Blob move completed successfully", extra={"src": src_blob, "dest": dest_blob})
-            else:
+            logger.debug("Copy operation initiated", extra={"copy_id": copy_info.get("copy_id")})
+
+            # Intra-account copies complete synchronously, so no status GET
+            # is needed; only poll (with backoff) if the service reports the
+            # copy as still pending, e.g. for a cross-account source
+            copy_status = copy_info.get("copy_status")
+            wait = 0.5
+            while copy_status == "pending":
+                time.sleep(wait)
+                wait = min(wait * 2, 8)
+                copy_status = dest_client.get_blob_properties().copy.status
+            logger.debug("Copy operation completed", extra={"copy_status": copy_status})
+
+            if copy_status not in (None, "success"):
                 raise Exception(f"Copy operation failed with status: {copy_status}")
-                
+
         except Exception as copy_err:
             logger.error("Copy operation failed", extra={"error": str(copy_err), "error_type": type(copy_err).__name__})
             raise
-            
+
     except Exception as move_err:
-        logger.error("Blob move operation failed", extra={"src": src_blob, "dest": dest_blob, "error": str(move_err), "error_type": type(move_err).__name__})
+        logger.error("Blob copy operation failed", extra={"src": src_blob, "dest": dest_blob, "error": str(move_err), "error_type": type(move_err).__name__})
         raise
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=8))
-def periodic_health_check():
-    """Periodic health check to verify system components."""
-    logger.info("Running periodic health check")
-    
+# (src_blob, delivery_tag) pairs copied but not yet deleted/acked
+_pending_deletes = []
+_messages_processed = 0
+
+
+def flush_pending_deletes(ch, error_publisher):
+    """Delete copied source blobs in one batched request and ack them."""
+    if not _pending_deletes:
+        return
+
+    names = [name for name, _ in _pending_deletes]
+    last_tag = _pending_deletes[-1][1]
     try:
-        # Check container client
-        if container_client is None:
-            raise ValueError("Container client is None")
-            
-        # Test blob operations
-        logger.info("Testing blob list operation")
-        blobs = list(container_client.list_blobs(name_starts_with="test-"))
-        logger.info("Health check: blob list successful", extra={"blob_count": len(blobs)})
-
-        # Test blob client creation
-        logger.info("Testing blob client creation")
-        test_blob_client = container_client.get_blob_client("health-check-test.txt")
-        logger.info("Health check: blob client creation successful")
-        
-        return True
-        
-    except Exception as health_err:
-        error_msg = f"Health check failed: {type(health_err).__name__}: {str(health_err)}"
-        logger.error(error_msg)
-        logger.error(f"Health check error details - Type: {type(health_err)}, Args: {health_err.args}")
-        raise
+        # One batched HTTP request instead of one delete round-trip per blob
+        container_client.delete_blobs(*names)
+        logger.info("Flushed batched source deletes", extra={"deleted": len(names)})
+    except Exception as delete_err:
+        logger.error("Batched source delete failed", extra={"error": str(delete_err), "blob_count": len(names)})
+        publish_error(error_publisher, ERROR_QUEUE, delete_err, {"blobs": names})
+    finally:
+        # Ack the whole window in one frame; a failed delete was routed to
+        # the error queue rather than redelivered (the copies already exist)
+        ch.basic_ack(delivery_tag=last_tag, multiple=True)
+        _pending_deletes.clear()
 
 
 # ---------------------------------------------------------------------------
 # Rabbit utilities
 # ---------------------------------------------------------------------------
 
+def rabbit_parameters() -> "pika.ConnectionParameters":
+    creds = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+    return pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds)
+
+
 @retry(stop=stop_after_attempt(10), wait=wait_exponential(multiplier=1, min=4, max=10))
 def get_rabbit_connection():
     logger.info("Attempting to connect to RabbitMQ", extra={"host": RABBITMQ_HOST, "port": RABBITMQ_PORT})
-    creds = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
-    params = pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds)
-    return pika.BlockingConnection(params)
+    return pika.BlockingConnection(rabbit_parameters())
+
+
+_UTC = timezone.utc
+_PROCESSOR_ID = str(uuid.uuid4())  # stable for the lifetime of the process
+
+_error_publisher: "RabbitPublisher" = None
+
+
+def get_error_publisher() -> "RabbitPublisher":
+    """Lazily build the error-queue publisher on its own connection."""
+    global _error_publisher
+    if _error_publisher is None:
+        _error_publisher = RabbitPublisher(rabbit_parameters(), (ERROR_QUEUE,), logger=logger)
+    return _error_publisher
 
 
 def ensure_queues(channel):
@@ -207,23 +259,39 @@ def ensure_queues(channel):
 # Message processing
 # ---------------------------------------------------------------------------
 
-def process_message(ch, method, properties, body):  # noqa: N803 – pika naming
-    logger.info("=== RECEIVED MESSAGE ===", extra={"body_type": type(body).__name__, "body_length": len(body) if body else 0})
-    
+@dataclass(slots=True)
+class BlobEvent:
+    """Parsed blob event; slots make field access plain attribute loads."""
+    path: str
+    blob: str
+    dest: str
+    container: str = ""
+    timestamp: str = ""
+
+
+def process_message(error_publisher, ch, method, properties, body):  # noqa: N803 – pika naming
+    global _messages_processed
+    logger.debug("Received message", extra={"body_length": len(body) if body else 0})
+
     try:
-        logger.info("Raw message body", extra={"raw_body": body.decode() if body else "empty"})
-        
-        msg = json.loads(body)
-        logger.info("Parsed JSON message", extra={"parsed_message": msg})
-        
-        # Validate required message fields
-        required_keys = ["path", "blob", "dest"]
-        missing_keys = [key for key in required_keys if key not in msg]
-        if missing_keys:
-            raise KeyError(f"Missing required keys: {missing_keys}")
-        
-        # Build source and destination blob paths
-        src_blob = os.path.join(msg["path"], msg["blob"]) if msg["path"] else msg["blob"]
+        msg = _loads(body)
+        logger.debug("Parsed JSON message", extra={"parsed_message": msg})
+
+        # Parse once into slots so downstream access is attribute loads
+        # instead of repeated dict probes. Only the known fields are picked
+        # out: the event handler deploys independently, so extra fields in
+        # newer messages must not fail construction
+        event = BlobEvent(
+            path=msg["path"],
+            blob=msg["blob"],
+            dest=msg["dest"],
+            container=msg.get("container", ""),
+            timestamp=msg.get("timestamp", ""),
+        )
+
+        # Build source and destination blob paths; blob paths are always
+        # forward-slash and build_message guarantees the trailing separator
+        src_blob = event.path + event.blob if event.path else event.blob
         
         # Create processed path - move files to "processed/" folder
         if src_blob.startswith("sample/"):
@@ -233,40 +301,45 @@ def process_message(ch, method, properties, body):  # noqa: N803 – pika naming
             # For other paths, add processed/ prefix
             dest_blob = f"processed/{src_blob}"
         
-        logger.info("Processing blob movement", extra={
-            "src_blob": src_blob, 
+        logger.debug("Processing blob movement", extra={
+            "src_blob": src_blob,
             "dest_blob": dest_blob,
-            "container": msg.get("container", "unknown")
+            "container": event.container or "unknown"
         })
         
-        # Perform the blob move operation
-        move_blob(src_blob, dest_blob)
-        
+        # Copy now; the source delete and the ack are deferred so bursts
+        # coalesce into one batched delete + one multiple-ack
+        copy_blob(src_blob, dest_blob)
+        _pending_deletes.append((src_blob, method.delivery_tag))
+        if len(_pending_deletes) >= BATCH_DELETE_SIZE:
+            flush_pending_deletes(ch, error_publisher)
+
         logger.info("Blob processing completed successfully", extra={
             "src_blob": src_blob,
             "dest_blob": dest_blob
         })
-        
-        # Acknowledge the message only after successful processing
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
-        # CRITICAL: Exit after processing one message (single-job mode)
-        logger.info("Single message processed successfully - terminating container", extra={"message_processed": True})
-        ch.stop_consuming()  # Stop consuming more messages
+
+        # CRITICAL: Exit once the message budget is spent (single-job mode
+        # by default)
+        _messages_processed += 1
+        if _messages_processed >= MAX_MESSAGES:
+            flush_pending_deletes(ch, error_publisher)
+            logger.info("Message budget spent - terminating container", extra={"messages_processed": _messages_processed})
+            ch.stop_consuming()  # Stop consuming more messages
         return True  # Signal successful completion
         
     except json.JSONDecodeError as json_err:
         error_msg = f"JSON decode error: {str(json_err)}"
         logger.error(error_msg)
-        publish_error(ch, ERROR_QUEUE, json_err, {"raw_body": body.decode() if body else "empty"})
+        publish_error(error_publisher, ERROR_QUEUE, json_err, {"raw_body": body.decode() if body else "empty"})
         ch.basic_ack(delivery_tag=method.delivery_tag)  # Ack to avoid reprocessing bad JSON
         ch.stop_consuming()  # Exit even on error
         return False
         
-    except KeyError as key_err:
-        error_msg = f"Missing required message fields: {str(key_err)}"
+    except (KeyError, TypeError) as key_err:
+        error_msg = f"Invalid message fields: {str(key_err)}"
         logger.error(error_msg)
-        publish_error(ch, ERROR_QUEUE, key_err, msg if 'msg' in locals() else {})
+        publish_error(error_publisher, ERROR_QUEUE, key_err, msg if 'msg' in locals() else {})
         ch.basic_ack(delivery_tag=method.delivery_tag)  # Ack to avoid reprocessing bad messages
         ch.stop_consuming()  # Exit even on error
         return False
@@ -276,11 +349,10 @@ def process_message(ch, method, properties, body):  # noqa: N803 – pika naming
         logger.error(error_msg)
         logger.error(f"Exception details - Type: {type(exc)}, Args: {exc.args}")
         if hasattr(exc, '__traceback__'):
-            import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
         
         # Publish error and decide whether to acknowledge or reject
-        publish_error(ch, ERROR_QUEUE, exc, msg if 'msg' in locals() else {})
+        publish_error(error_publisher, ERROR_QUEUE, exc, msg if 'msg' in locals() else {})
         
         # For transient errors, we might want to retry, but for now, acknowledge to prevent infinite loops
         ch.basic_ack(delivery_tag=method.delivery_tag)
@@ -288,27 +360,22 @@ def process_message(ch, method, properties, body):  # noqa: N803 – pika naming
         return False
 
 
-def publish_error(channel, error_queue: str, error: Exception, failed_message: dict):
+def publish_error(error_publisher, error_queue: str, error: Exception, failed_message: dict):
     """Publish error information to error queue."""
     try:
         logger.info("Publishing error to error queue", extra={"queue": error_queue, "error_type": type(error).__name__})
-        
+
         error_msg = {
             "error": str(error),
             "error_type": type(error).__name__,
             "failed_message": failed_message,
-            "failed_at": datetime.now(datetime.UTC).isoformat(),
-            "processor_id": str(uuid.uuid4())
+            "failed_at": datetime.now(_UTC).isoformat(),
+            "processor_id": _PROCESSOR_ID
         }
-        
-        channel.basic_publish(
-            exchange="",
-            routing_key=error_queue,
-            body=json.dumps(error_msg),
-            properties=pika.BasicProperties(delivery_mode=2)  # persistent
-        )
+
+        error_publisher.publish(error_queue, _dumps(error_msg))
         logger.info("Error published to queue successfully")
-        
+
     except Exception as pub_err:
         logger.error("Failed to publish error to queue", extra={"error": str(pub_err)})
 
@@ -317,44 +384,39 @@ def publish_error(channel, error_queue: str, error: Exception, failed_message: d
 # Main entry
 # ---------------------------------------------------------------------------
 
-def run_periodic_health_checks():
-    """Background thread to run periodic health checks"""
-    logger.info("Starting periodic health check thread")
-    
-    while True:
-        try:
-            time.sleep(30)  # Run every 30 seconds to match the timing we see
-            logger.info("Triggering scheduled health check")
-            periodic_health_check()
-            logger.info("Scheduled health check completed successfully")
-        except Exception as health_thread_err:
-            logger.error("Health check thread error", extra={"error": str(health_thread_err), "error_type": type(health_thread_err).__name__})
-            # Continue running even if health check fails
-
-
 def main():
-    logger.info("Starting BlobProcessor in single-job mode", extra={"event": "startup", "mode": "single_message"})
-
-    rabbit_conn = get_rabbit_connection()
-    channel = rabbit_conn.channel()
-    ensure_queues(channel)
-
-    # No health check thread needed for single-job mode
-    logger.info("Configured for single message processing - no background threads")
-
-    channel.basic_qos(prefetch_count=1)  # Process one message at a time
-    channel.basic_consume(queue=EVENT_QUEUE, on_message_callback=process_message)
-
-    logger.info("Waiting for single message", extra={"queue": EVENT_QUEUE})
+    logger.info("Starting BlobProcessor", extra={"event": "startup", "max_messages": MAX_MESSAGES})
+
+    # Dedicated connections: one for consuming, one for publishing errors,
+    # so broker backpressure on the publish side cannot stall consumer acks
+    consume_conn = get_rabbit_connection()
+    consume_ch = consume_conn.channel()
+    ensure_queues(consume_ch)
+    error_publisher = get_error_publisher()
+
+
+    # Keep the pipeline full, but never hold more messages than this
+    # container will actually process: with the default single-message
+    # budget a larger prefetch would starve the rest of the processor pool
+    consume_ch.basic_qos(prefetch_count=min(PREFETCH_COUNT, MAX_MESSAGES))
+    consume_ch.basic_consume(
+        queue=EVENT_QUEUE,
+        on_message_callback=functools.partial(process_message, error_publisher),
+    )
+
+    logger.info("Waiting for messages", extra={"queue": EVENT_QUEUE, "max_messages": MAX_MESSAGES})
     try:
-        channel.start_consuming()
+        consume_ch.start_consuming()
         logger.info("Message processing completed - container will now terminate")
     except Exception as consume_err:
         logger.error("Error during message consumption", extra={"error": str(consume_err)})
     finally:
         try:
-            rabbit_conn.close()
-            logger.info("RabbitMQ connection closed")
+            # Backstop: make sure nothing copied is left undeleted/unacked
+            flush_pending_deletes(consume_ch, error_publisher)
+            consume_conn.close()
+            error_publisher.close()
+            logger.info("RabbitMQ connections closed")
         except Exception as close_err:
             logger.error("Error closing connection", extra={"error": str(close_err)})
         
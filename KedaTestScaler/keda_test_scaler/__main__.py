@@ -1,29 +1,44 @@
+import contextlib
 import json
 import logging
 import os
-import subprocess
 import sys
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Any, Dict
+from urllib.parse import quote
 
+import pika  # type: ignore
 import requests
-from opentelemetry import trace  # type: ignore
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter  # type: ignore
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource  # type: ignore
-from opentelemetry.sdk.trace import TracerProvider  # type: ignore
-from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
-from pythonjsonlogger import jsonlogger  # type: ignore
+from requests.adapters import HTTPAdapter, Retry
+
+try:
+    # orjson decodes the Podman container listings several times faster
+    # than stdlib json, and they are re-parsed every scale iteration
+    import orjson  # type: ignore
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 RABBITMQ_API = os.getenv("RABBITMQ_API", "http://rabbitmq:15672/api/queues/%2F/blob.events")
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", "5672"))
 RABBITMQ_USER = os.getenv("RABBITMQ_USER", "ic-tester")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "ic-tester")
+RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "blob.events")
+
+CONTAINER_HOST = os.getenv("CONTAINER_HOST", "tcp://127.0.0.1:8888")
 
 PROCESSOR_IMAGE = os.getenv("BLOB_PROCESSOR_IMAGE", "localhost/sandboxtest/blob-processor:latest")
 MAX_REPLICAS = int(os.getenv("MAX_REPLICAS", "10"))
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "2"))  # Check every 2 seconds for responsive scaling
+BACKSTOP_INTERVAL = int(os.getenv("BACKSTOP_INTERVAL", "30"))  # safety-net poll when no push notifications arrive
 NETWORK_NAME = os.getenv("APP_NETWORK", "app-network")
 LABEL_MANAGED_BY = "keda-test-scaler"
 LABEL_ROLE = "blob_processor"
@@ -42,129 +57,271 @@ logger, tracer = init_logging(SERVICE_NAME_VALUE)
 # Helpers
 # ---------------------------------------------------------------------------
 
-def run_podman_command(args: List[str]) -> str:
-    """Run a podman command and return the output."""
-    cmd = ["podman"] + args
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error("Podman command failed", extra={
-            "command": " ".join(cmd),
-            "return_code": e.returncode,
-            "stdout": e.stdout,
-            "stderr": e.stderr
+def _podman_base_url(host: str) -> str:
+    """Map a CONTAINER_HOST value onto a requests-compatible base URL."""
+    if host.startswith("unix://"):
+        return "http+unix://" + quote(host[len("unix://"):], safe="")
+    if host.startswith("tcp://"):
+        return "http://" + host[len("tcp://"):]
+    return host
+
+
+PODMAN_API = _podman_base_url(CONTAINER_HOST) + "/v4.0.0/libpod"
+
+
+def _podman_session():
+    if PODMAN_API.startswith("http+unix://"):
+        import requests_unixsocket  # type: ignore
+        return requests_unixsocket.Session()
+    return requests.Session()
+
+
+# One keep-alive session to the Podman API instead of a fork/exec of the
+# podman CLI per call
+PODMAN_SESSION = _podman_session()
+
+# Constant URLs, filters and the invariant part of the container spec are
+# built once at import time, not per scale iteration
+_CONTAINERS_URL = PODMAN_API + "/containers"
+_LIST_URL = _CONTAINERS_URL + "/json"
+_CREATE_URL = _CONTAINERS_URL + "/create"
+_LIST_FILTERS = json.dumps({"label": [f"managed-by={LABEL_MANAGED_BY}", f"role={LABEL_ROLE}"]})
+
+_CONTAINER_SPEC_BASE = {
+    "image": PROCESSOR_IMAGE,
+    "labels": CONTAINER_LABEL,
+    "env": {
+        "RABBITMQ_HOST": "rabbitmq",
+        "RABBITMQ_USER": RABBITMQ_USER,
+        "RABBITMQ_PASS": RABBITMQ_PASS,
+    },
+    "netns": {"nsmode": "bridge"},
+    "Networks": {NETWORK_NAME: {}},
+}
+
+
+def podman_request(method: str, url: str, **kwargs) -> requests.Response:
+    """Issue one request against the Podman libpod API over the shared session."""
+    resp = PODMAN_SESSION.request(method, url, timeout=30, **kwargs)
+    if resp.status_code >= 300:
+        logger.error("Podman API call failed", extra={
+            "method": method,
+            "url": url,
+            "status": resp.status_code,
+            "body": resp.text[:500]
         })
-        raise
+        resp.raise_for_status()
+    return resp
+
+
+# Keep-alive session to the RabbitMQ management API: no TCP handshake,
+# HTTP setup or auth re-negotiation on every poll
+RABBIT_SESSION = requests.Session()
+RABBIT_SESSION.auth = (RABBITMQ_USER, RABBITMQ_PASS)
+RABBIT_SESSION.headers["Accept"] = "application/json"
+RABBIT_SESSION.mount(
+    "http://",
+    HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(total=2, backoff_factor=0.1)),
+)
+
+
+_amqp_conn = None
+_amqp_ch = None
+
+
+def _amqp_channel():
+    global _amqp_conn, _amqp_ch
+    if _amqp_ch is None or not _amqp_ch.is_open:
+        creds = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+        _amqp_conn = pika.BlockingConnection(
+            pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds, heartbeat=30)
+        )
+        _amqp_ch = _amqp_conn.channel()
+    return _amqp_ch
+
+
+def _drop_amqp_connection():
+    global _amqp_conn, _amqp_ch
+    try:
+        if _amqp_conn is not None and _amqp_conn.is_open:
+            _amqp_conn.close()
+    except Exception:
+        pass
+    _amqp_conn = None
+    _amqp_ch = None
 
 
 def get_queue_length() -> int:
-    resp = requests.get(RABBITMQ_API, auth=(RABBITMQ_USER, RABBITMQ_PASS), timeout=5)
-    resp.raise_for_status()
-    data: Dict[str, Any] = resp.json() or {}
-    return int(data.get("messages_ready", 0))
+    # Passive declare returns the ready count as one tiny AMQP frame on an
+    # already-open socket; the management API aggregates cluster-wide stats
+    # and is much slower to answer
+    try:
+        return _amqp_channel().queue_declare(queue=RABBITMQ_QUEUE, passive=True).method.message_count
+    except pika.exceptions.AMQPError as amqp_err:
+        _drop_amqp_connection()
+        logger.warning("AMQP queue check failed, falling back to management API", extra={"error": str(amqp_err)})
+        resp = RABBIT_SESSION.get(RABBITMQ_API, timeout=5)
+        resp.raise_for_status()
+        data: Dict[str, Any] = _loads(resp.content) or {}
+        return int(data.get("messages_ready", 0))
 
 
 def list_processor_containers() -> List[Dict[str, Any]]:
     """List containers with our labels."""
     try:
-        output = run_podman_command([
-            "ps", "--format", "json",
-            "--filter", f"label=managed-by={LABEL_MANAGED_BY}",
-            "--filter", f"label=role={LABEL_ROLE}"
-        ])
-        if output.strip():
-            return json.loads(output)
-        return []
-    except subprocess.CalledProcessError as e:
+        resp = podman_request("GET", _LIST_URL, params={"filters": _LIST_FILTERS})
+        return _loads(resp.content) or []
+    except requests.RequestException as e:
         logger.error("Failed to list processor containers", extra={"error": str(e)})
         return []  # Return empty list if we can't list containers
 
 
+def _start_one_container(_: int):
+    # uuid suffix instead of a millisecond timestamp so concurrent starts
+    # cannot collide on the name
+    container_name = f"blob-processor-{uuid.uuid4().hex[:8]}"
+    spec = dict(_CONTAINER_SPEC_BASE, name=container_name)
+    created = _loads(podman_request("POST", _CREATE_URL, json=spec).content)
+    podman_request("POST", f"{_CONTAINERS_URL}/{created['Id']}/start")
+    logger.info("Started container", extra={"container_name": container_name})
+
+
 def scale_up(count: int):
+    if count <= 0:
+        return
     logger.info("Scaling up", extra={"count": count})
-    for _ in range(count):
-        container_name = f"blob-processor-{int(time.time()*1000)}"
-        run_podman_command([
-            "run", "-d",
-            "--network", NETWORK_NAME,
-            "--label", f"managed-by={LABEL_MANAGED_BY}",
-            "--label", f"role={LABEL_ROLE}",
-            "-e", f"RABBITMQ_HOST=rabbitmq",
-            "-e", f"RABBITMQ_USER={RABBITMQ_USER}",
-            "-e", f"RABBITMQ_PASS={RABBITMQ_PASS}",
-            "--name", container_name,
-            PROCESSOR_IMAGE
-        ])
-        logger.info("Started container", extra={"container_name": container_name})
+    # Fire all creates in one concurrent burst; serial starts cost 1-2s
+    # each, during which the queue keeps growing
+    with ThreadPoolExecutor(max_workers=min(count, 16)) as ex:
+        list(ex.map(_start_one_container, range(count)))
+
+
+def _remove_container(container_id: str):
+    logger.info("Stopping container", extra={"id": container_id})
+    try:
+        # Forced delete SIGTERMs, waits and removes in one API call
+        podman_request("DELETE", f"{_CONTAINERS_URL}/{container_id}", params={"force": "true", "timeout": 5})
+    except requests.RequestException as exc:
+        logger.exception("Failed to stop container", extra={"id": container_id, "error": str(exc)})
 
 
 def scale_down(count: int):
+    if count <= 0:
+        return
     logger.info("Scaling down", extra={"count": count})
-    containers = list_processor_containers()[:count]
-    for c in containers:
-        container_id = c.get("Id", c.get("ID", ""))[:12]
-        if container_id:
-            logger.info("Stopping container", extra={"id": container_id})
-            try:
-                run_podman_command(["stop", "-t", "5", container_id])
-                run_podman_command(["rm", container_id])
-            except subprocess.CalledProcessError as exc:
-                logger.exception("Failed to stop container", extra={"error": str(exc)})
-
-
-def cleanup_stale_containers():
-    """Clean up containers that may have failed to auto-terminate."""
+    container_ids = [
+        c.get("Id", c.get("ID", ""))[:12] for c in list_processor_containers()[:count]
+    ]
+    container_ids = [container_id for container_id in container_ids if container_id]
+    if not container_ids:
+        return
+    # Each forced delete can block for its full stop timeout; tear the
+    # batch down concurrently, mirroring scale_up
+    with ThreadPoolExecutor(max_workers=min(len(container_ids), 16)) as ex:
+        list(ex.map(_remove_container, container_ids))
+
+
+# Processors that outlive this age have failed to auto-terminate
+_STALE_AFTER_SECONDS = 300
+
+
+def cleanup_stale_containers(containers: List[Dict[str, Any]]):
+    """Clean up containers that may have failed to auto-terminate.
+
+    Works off the listing the main loop already fetched for its running
+    count, so no second Podman round trip is needed per iteration.
+    """
     try:
-        containers = list_processor_containers()
+        cutoff = time.time() - _STALE_AFTER_SECONDS
         for c in containers:
+            # libpod serializes Created as an RFC3339 string; StartedAt is a
+            # plain unix timestamp (0 for containers that never started, so
+            # failed starts age out too)
+            if (c.get("StartedAt") or 0) >= cutoff:
+                continue
             container_id = c.get("Id", c.get("ID", ""))[:12]
             if container_id:
-                # Check if container has been running too long (more than 5 minutes is suspicious)
-                created_str = c.get("CreatedAt", "")
-                if created_str:
-                    try:
-                        # Parse creation time and check age
-                        from datetime import datetime, timezone
-                        import re
-                        
-                        # Handle different timestamp formats
-                        if "ago" in created_str:
-                            # Skip parsing "X minutes ago" format for now
-                            continue
-                            
-                        # Remove timezone info for parsing
-                        clean_time = re.sub(r'\s+[A-Z]{3,4}$', '', created_str)
-                        created_time = datetime.strptime(clean_time, "%Y-%m-%d %H:%M:%S")
-                        age_seconds = (datetime.now() - created_time).total_seconds()
-                        
-                        if age_seconds > 300:  # 5 minutes
-                            logger.info("Cleaning up stale container", extra={
-                                "container_id": container_id,
-                                "age_seconds": age_seconds
-                            })
-                            run_podman_command(["stop", "-t", "5", container_id])
-                            run_podman_command(["rm", container_id])
-                    except Exception as parse_err:
-                        logger.debug("Could not parse container creation time", extra={
-                            "container_id": container_id,
-                            "created_str": created_str,
-                            "error": str(parse_err)
-                        })
+                logger.info("Cleaning up stale container", extra={"container_id": container_id})
+                podman_request("DELETE", f"{_CONTAINERS_URL}/{container_id}", params={"force": "true", "timeout": 5})
     except Exception as cleanup_err:
         logger.error("Error during container cleanup", extra={"error": str(cleanup_err)})
 
+# ---------------------------------------------------------------------------
+# Push notifications
+# ---------------------------------------------------------------------------
+
+# Set by the notify consumer the moment a message lands on the queue
+_wake = threading.Event()
+
+# Debounce window so notification bursts trigger at most ~2 iterations/s
+_MIN_ITERATION_GAP = 0.5
+
+# Span creation is skipped entirely when tracing is off; the no-op stub is
+# cheap but nullcontext is free
+_TRACING_ON = bool(os.getenv("OTLP_ENDPOINT"))
+
+# Unchanged scale state is logged at most this often (seconds)
+_HEARTBEAT_INTERVAL = 60
+
+
+def _notify_consumer():
+    """Throwaway consumer that nacks everything and wakes the scale loop.
+
+    Messages are immediately requeued for the real processors; this consumer
+    only exists so scale decisions trigger within milliseconds of the first
+    enqueue instead of up to a full poll interval later.
+    """
+    while True:
+        try:
+            creds = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+            conn = pika.BlockingConnection(
+                pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=creds, heartbeat=30)
+            )
+            ch = conn.channel()
+            ch.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+            ch.basic_qos(prefetch_count=1)
+
+            def _on_msg(channel, method, properties, body):
+                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+                _wake.set()
+                channel.stop_consuming()
+
+            while True:
+                ch.basic_consume(queue=RABBITMQ_QUEUE, on_message_callback=_on_msg)
+                ch.start_consuming()  # returns after the first notification
+                # Debounce before re-subscribing so a non-empty queue does
+                # not turn into a nack/redeliver spin
+                time.sleep(1)
+        except Exception as notify_err:
+            logger.warning("Notify consumer failed, retrying", extra={"error": str(notify_err)})
+            time.sleep(5)
+
+
 # ---------------------------------------------------------------------------
 # Main loop
 # ---------------------------------------------------------------------------
 
 def main():
     logger.info("Starting KedaTestScaler for single-job containers", extra={"event": "startup", "mode": "single_job"})
+
+    # Push model: wake on enqueue, with a backstop poll as the safety net
+    threading.Thread(target=_notify_consumer, daemon=True, name="queue-notify").start()
+
+    backstop = CHECK_INTERVAL
+    last_state = None
+    last_heartbeat = time.monotonic()
     while True:
-        with tracer.start_as_current_span("scale_iteration"):
-            try:
+        # The span covers only the actual work; the backstop wait below can
+        # block for 30s and must not inflate scale_iteration durations
+        span_cm = (
+            tracer.start_as_current_span("scale_iteration")
+            if _TRACING_ON else contextlib.nullcontext()
+        )
+        try:
+            with span_cm:
                 q_len = get_queue_length()
-                running = len(list_processor_containers())
+                containers = list_processor_containers()
+                running = len(containers)
                 
                 # Maintain a constant pool of active containers up to MAX_REPLICAS
                 # as long as there are messages in the queue
@@ -191,18 +348,38 @@ def main():
 
                 # Clean up any containers that may have failed to auto-terminate
                 # (This is a safety measure - containers should exit on their own)
-                cleanup_stale_containers()
-
-                logger.info("Scale iteration", extra={
-                    "queue_len": q_len, 
-                    "running": running, 
-                    "target": MAX_REPLICAS if q_len > 0 else 0,
-                    "mode": "single_job"
-                })
-            except Exception as exc:
-                logger.exception("Scaler iteration failed", extra={"error": str(exc)})
-            finally:
-                time.sleep(CHECK_INTERVAL)
+                cleanup_stale_containers(containers)
+
+                # Steady state stays quiet: emit the iteration line only
+                # when the numbers move, plus a once-a-minute heartbeat
+                state = (q_len, running, MAX_REPLICAS if q_len > 0 else 0)
+                now = time.monotonic()
+                if state != last_state or now - last_heartbeat >= _HEARTBEAT_INTERVAL:
+                    last_state = state
+                    last_heartbeat = now
+                    logger.info("Scale iteration", extra={
+                        "queue_len": q_len,
+                        "running": running,
+                        "target": state[2],
+                        "mode": "single_job"
+                    })
+
+                # Adaptive backstop: stay responsive while anything is in
+                # flight, decay toward the cap once fully idle (push
+                # notifications still wake the loop instantly)
+                if q_len > 0 or running > 0:
+                    backstop = CHECK_INTERVAL
+                else:
+                    backstop = min(backstop * 2, BACKSTOP_INTERVAL)
+        except Exception as exc:
+            logger.exception("Scaler iteration failed", extra={"error": str(exc)})
+
+        # Block in the kernel until a message lands or the backstop expires;
+        # debounce wakes so bursts coalesce
+        woke = _wake.wait(timeout=backstop)
+        _wake.clear()
+        if woke:
+            time.sleep(_MIN_ITERATION_GAP)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,11 @@
+import asyncio
 import logging
 import os
 import sys
 from pathlib import Path
 
-from azure.storage.blob import BlobServiceClient  # type: ignore
-from opentelemetry import trace  # type: ignore
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter  # type: ignore
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource  # type: ignore
-from opentelemetry.sdk.trace import TracerProvider  # type: ignore
-from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
-from pythonjsonlogger import jsonlogger  # type: ignore
+from azure.core.exceptions import ResourceExistsError  # type: ignore
+from azure.storage.blob.aio import BlobServiceClient  # type: ignore
 
 SERVICE_NAME_VALUE = os.getenv("OTEL_SERVICE_NAME", "azurite-init")
 
@@ -32,29 +28,34 @@ SAMPLE_FILE = os.getenv("SAMPLE_FILE", "sample.txt")
 # Main logic
 # ---------------------------------------------------------------------------
 
+async def _create_container(blob_service, name: str):
+    try:
+        await blob_service.create_container(name)
+        logger.info("Created container", extra={"container": name})
+    except ResourceExistsError:
+        logger.info("Container exists", extra={"container": name})
+
+
+async def _init():
+    # One shared client (and TCP connection) for the whole run; container
+    # creations are independent round-trips, so fire them concurrently
+    async with BlobServiceClient.from_connection_string(AZURITE_CONN_STR) as blob_service:
+        await asyncio.gather(
+            *(_create_container(blob_service, name.strip()) for name in CONTAINERS if name.strip())
+        )
+
+        if SEED_SAMPLE:
+            with tracer.start_as_current_span("seed_sample"):
+                incoming_client = blob_service.get_blob_client(container="incoming", blob="sample/" + SAMPLE_FILE)
+                # Create sample content
+                data = f"Hello – seeded at {os.getenv('INIT_TIMESTAMP', 'startup')}".encode()
+                await incoming_client.upload_blob(data, overwrite=True)
+                logger.info("Uploaded sample blob", extra={"blob": incoming_client.blob_name})
+
+
 def main():
     logger.info("Initializing Azurite containers", extra={"containers": CONTAINERS})
-    blob_service = BlobServiceClient.from_connection_string(AZURITE_CONN_STR)
-
-    for name in CONTAINERS:
-        name = name.strip()
-        if not name:
-            continue
-        container_client = blob_service.get_container_client(name)
-        try:
-            container_client.create_container()
-            logger.info("Created container", extra={"container": name})
-        except Exception:
-            logger.info("Container exists", extra={"container": name})
-
-    if SEED_SAMPLE:
-        with tracer.start_as_current_span("seed_sample"):
-            incoming_client = blob_service.get_blob_client(container="incoming", blob="sample/" + SAMPLE_FILE)
-            # Create sample content
-            data = f"Hello – seeded at {os.getenv('INIT_TIMESTAMP', 'startup')}".encode()
-            incoming_client.upload_blob(data, overwrite=True)
-            logger.info("Uploaded sample blob", extra={"blob": incoming_client.blob_name})
-
+    asyncio.run(_init())
     logger.info("Azurite initialization complete")
 
 
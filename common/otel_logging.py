@@ -0,0 +1,165 @@
+"""Shared logging and tracing setup for all services.
+
+Each Containerfile copies this module to the image root so services keep
+importing it as ``from otel_logging import init_logging``. The OpenTelemetry
+SDK (and its gRPC exporter) is only imported when OTLP_ENDPOINT is
+configured, so cold start stays light and the returned tracer is a cheap
+no-op stub when tracing is off.
+"""
+import atexit
+import functools
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Tuple
+
+import json
+
+try:
+    # orjson keeps per-log-line serialization off the hot path's back
+    import orjson  # type: ignore
+
+    def _dump_json(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _dump_json(obj) -> str:
+        return json.dumps(obj)
+
+
+# Per-record thread/process introspection is never emitted by JsonFormatter,
+# so skip those lookups when records are created
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+# LogRecord attributes that are not user-supplied extras
+_RESERVED = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename',
+    'module', 'exc_info', 'exc_text', 'stack_info', 'lineno', 'funcName',
+    'created', 'msecs', 'relativeCreated', 'thread', 'threadName',
+    'processName', 'process', 'getMessage', 'message', 'taskName',
+})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        log_entry = {
+            "asctime": "%s,%03d" % (
+                time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(record.created)),
+                record.msecs,
+            ),
+            "levelname": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+            "taskName": None
+        }
+
+        # Merge user-supplied extras via set difference instead of scanning
+        # every record attribute against a list
+        record_dict = record.__dict__
+        for key in record_dict.keys() - _RESERVED:
+            log_entry[key] = record_dict[key]
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            log_entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            log_entry["stack_info"] = self.formatStack(record.stack_info)
+
+        return _dump_json(log_entry)
+
+
+class _PassthroughQueueHandler(QueueHandler):
+    # The default prepare() formats the record up-front to make it picklable;
+    # the listener runs in this same process, so hand the record over as-is
+    def prepare(self, record):
+        return record
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _NoopTracer:
+    """Stands in for an OTEL tracer when OTLP_ENDPOINT is not configured."""
+
+    def start_as_current_span(self, name, *args, **kwargs):
+        return _NOOP_SPAN
+
+
+# Both stubs are stateless, so every caller shares the same instances and
+# span entry in a hot loop allocates nothing
+_NOOP_SPAN = _NoopSpan()
+_NOOP_TRACER = _NoopTracer()
+
+_tracing_initialized = False
+
+
+def _build_tracer(service_name: str) -> Any:
+    global _tracing_initialized
+
+    otlp_endpoint = os.getenv("OTLP_ENDPOINT")
+    if not otlp_endpoint:
+        return _NOOP_TRACER
+
+    # Lazy import: the OTEL SDK plus the gRPC exporter cost hundreds of ms
+    # at import time, so only pay it when tracing is actually on
+    from opentelemetry import trace  # type: ignore
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter  # type: ignore
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource  # type: ignore
+    from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor  # type: ignore
+    from opentelemetry.sdk.trace.sampling import TraceIdRatioBased  # type: ignore
+
+    if not _tracing_initialized:
+        # Sample a small ratio of traces and export in large, infrequent
+        # batches so per-span cost stays off the message hot paths
+        sampler_ratio = float(os.getenv("OTEL_SAMPLER_RATIO", "0.01"))
+        resource = Resource(attributes={SERVICE_NAME: service_name})
+        provider = TracerProvider(resource=resource, sampler=TraceIdRatioBased(sampler_ratio))
+        exporter = OTLPSpanExporter(endpoint=otlp_endpoint, insecure=True)
+        provider.add_span_processor(
+            BatchSpanProcessor(
+                exporter,
+                max_queue_size=8192,
+                schedule_delay_millis=10000,
+                max_export_batch_size=512,
+            )
+        )
+        trace.set_tracer_provider(provider)
+        _tracing_initialized = True
+
+    return trace.get_tracer(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def init_logging(service_name: str) -> Tuple[logging.Logger, Any]:
+    # Cached per service name: repeat calls return the same (logger, tracer)
+    # pair without touching the tracer provider or handler setup again
+    logger = logging.getLogger(service_name)
+    if logger.handlers:
+        return logger, _build_tracer(service_name)
+
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    # Formatting and the stdout write happen on a background listener
+    # thread; the message hot path only enqueues the record
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(_PassthroughQueueHandler(log_queue))
+
+    return logger, _build_tracer(service_name)
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+import pika  # type: ignore
+from tenacity import retry, stop_after_attempt, wait_exponential  # type: ignore
+
+_PERSISTENT = pika.BasicProperties(delivery_mode=2)
+
+# Reconnect backoff bounds (seconds)
+_BACKOFF_MIN = 1.0
+_BACKOFF_MAX = 30.0
+
+
+class RabbitPublisher:
+    """Persistent RabbitMQ publisher with automatic reconnect.
+
+    Holds one long-lived connection and channel per publish intent; the target
+    queues are declared once up-front and publishes are serialized behind a
+    lock so a publisher instance can be shared across threads. When the broker
+    drops the connection mid-publish the publisher rebuilds it with
+    exponential backoff and retries, instead of surfacing the error to the
+    hot path.
+
+    Publisher confirms are deliberately not enabled: pika's BlockingChannel
+    waits for each message's ack synchronously once confirm_delivery() is on,
+    which would turn every publish into a full broker round-trip. Durable
+    queues plus persistent messages cover the delivery guarantees needed here.
+    """
+
+    def __init__(
+        self,
+        parameters: pika.ConnectionParameters,
+        queues: Iterable[str],
+        logger: Optional[logging.Logger] = None,
+    ):
+        self._parameters = parameters
+        self._queues = tuple(queues)
+        self._logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._reconnect_backoff = _BACKOFF_MIN
+        self._conn: Optional[pika.BlockingConnection] = None
+        self._channel = None
+        self._declared = False
+        # Pre-declare queues once at construction time
+        self._connect()
+
+    @retry(stop=stop_after_attempt(10), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _connect(self):
+        self._logger.info(
+            "Connecting RabbitMQ publisher",
+            extra={"host": self._parameters.host, "queues": list(self._queues)},
+        )
+        self._conn = pika.BlockingConnection(self._parameters)
+        self._channel = self._conn.channel()
+        # Queues are durable: declare once, publish many; reconnects skip
+        # the declare round-trip
+        if not self._declared:
+            for queue in self._queues:
+                self._channel.queue_declare(queue=queue, durable=True)
+            self._declared = True
+
+    def _drop_connection(self):
+        try:
+            if self._conn is not None and self._conn.is_open:
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+        self._channel = None
+
+    def publish(self, routing_key: str, body):
+        """Publish a persistent message, reconnecting on broker failure."""
+        with self._lock:
+            while True:
+                try:
+                    if self._channel is None or not self._channel.is_open:
+                        self._connect()
+                    self._channel.basic_publish(
+                        exchange="",
+                        routing_key=routing_key,
+                        body=body,
+                        properties=_PERSISTENT,
+                    )
+                    self._reconnect_backoff = _BACKOFF_MIN
+                    return
+                except (pika.exceptions.AMQPConnectionError, pika.exceptions.ChannelClosed) as exc:
+                    self._logger.warning(
+                        "Publish failed, reconnecting",
+                        extra={"error": str(exc), "backoff": self._reconnect_backoff},
+                    )
+                    self._drop_connection()
+                    time.sleep(self._reconnect_backoff)
+                    self._reconnect_backoff = min(self._reconnect_backoff * 2, _BACKOFF_MAX)
+
+    def close(self):
+        with self._lock:
+            self._drop_connection()